@@ -1,12 +1,26 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
 import os
+import fcntl
 import requests
 import time
 import random
 import json
+import hashlib
+import shutil
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 
+try:
+    from watchdog.observers import Observer
+    from watchdog.observers.polling import PollingObserver
+except ImportError:  # Watch mode is unavailable without watchdog
+    Observer = PollingObserver = None
+
 app = Flask(__name__)
 
 # Configuration paths
@@ -16,12 +30,16 @@ LOGS_DIR = os.path.join(CONFIG_DIR, "logs")
 LOG_FILE = os.path.join(LOGS_DIR, "backdrop_download.log")
 TITLES_FILE = os.path.join(CONFIG_DIR, "titles.json")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "settings.json")
+SCHEDULER_LOCK_FILE = os.path.join(CONFIG_DIR, "scheduler.lock")
+SCHEDULE_STATE_FILE = os.path.join(CONFIG_DIR, "schedule_state.json")
 
 # Ensure backdrop directory and logs directory exist
 os.makedirs(LOGS_DIR, exist_ok=True)
 os.makedirs(BACKDROP_DIR, exist_ok=True)
 
 scheduler = BackgroundScheduler()
+_scheduler_lock = None  # Held open by the one process that owns the scheduler
+_config_mtime = None  # Last settings.json mtime the schedule was built from
 
 # Default configuration
 default_config = {
@@ -34,11 +52,20 @@ default_config = {
     "run_frequency": "manual",
     "schedule_day": "monday",
     "schedule_time": "12:00",
+    "schedules": [],  # Named jobs: name, cron or interval, libraries, source, mode, jitter, max_runtime
     "data_source": "My Devices",  # Options: My Devices, Trakt List
     "movies_folder": "",
     "tvshows_folder": "",
     "trakt_movies_list": "",  # URL for Trakt Movies List
     "trakt_tvshows_list": "",  # URL for Trakt TV Shows List
+    "libraries": [],  # Library roots: name, type, path, path_map, folder_structure, source, watch
+    "export_media_server": "",  # Export backdrops into title folders for: plex, jellyfin, kodi, custom ("" = off)
+    "export_naming": {},  # Custom export names, e.g. {"first": "backdrop.jpg", "other": "backdrop{n}.jpg"}
+    "export_link": "auto",  # auto: hardlink/reflink when on the same filesystem, else copy; copy: always copy
+    "watch_mode": False,  # If True, download backdrops for new library folders as they appear
+    "watch_debounce": "30",  # Seconds without new folders before a batch is processed
+    "watch_max_wait": "300",  # Longest a batch waits after its first new folder, even if more keep arriving
+    "watch_poll_interval": "30",  # Seconds between scans of NFS/SMB libraries
     "use_trakt_api": False  # If True, use Trakt API to fetch TMDB IDs, otherwise use TMDB API
 }
 
@@ -68,6 +95,191 @@ if not os.path.exists(TITLES_FILE):
         json.dump([], f)  # Create an empty JSON array
     print("LOG: Created missing titles.json file")
 
+# Serializes read/modify/write of titles.json between the watcher and scheduled jobs
+_titles_lock = threading.RLock()
+_schedule_state_lock = threading.Lock()  # Guards schedule_state.json between concurrent jobs
+
+# Docker mounts for the legacy single movies/TV folder settings
+LEGACY_PATH_MAPS = {
+    "movie": {"/volume1/Movies": "/movies"},
+    "tv": {"/volume1/TV Shows": "/tvshows"},
+}
+
+DEFAULT_FOLDER_STRUCTURES = {
+    "movie": "{Movie CleanTitle} ({Release Year}) {tmdb-{TmdbId}}",
+    "tv": "{TV Show CleanTitle} ({Release Year}) {tmdb-{TmdbId}}",
+}
+
+def get_libraries(config):
+    """
+    Returns the configured library roots.
+    Falls back to the legacy movies_folder/tvshows_folder settings when no libraries are set.
+    """
+    libraries = []
+    for lib in config.get("libraries", []):
+        if not lib.get("path"):
+            continue
+        if lib.get("type", "movie") not in DEFAULT_FOLDER_STRUCTURES:
+            print(f"WARNING: Library '{lib.get('name', lib['path'])}' has unknown type '{lib['type']}' (use 'movie' or 'tv'), skipping...")
+            log_download(f"WARNING: Library '{lib.get('name', lib['path'])}' has unknown type '{lib['type']}' (use 'movie' or 'tv'), skipping...")
+            continue
+        libraries.append(lib)
+    if libraries:
+        return libraries
+
+    legacy = []
+    if config.get("movies_folder"):
+        legacy.append({
+            "name": "Movies",
+            "type": "movie",
+            "path": config["movies_folder"],
+            "path_map": LEGACY_PATH_MAPS["movie"],
+            "folder_structure": config.get("movies_folder_structure", DEFAULT_FOLDER_STRUCTURES["movie"]),
+        })
+    if config.get("tvshows_folder"):
+        legacy.append({
+            "name": "TV Shows",
+            "type": "tv",
+            "path": config["tvshows_folder"],
+            "path_map": LEGACY_PATH_MAPS["tv"],
+            "folder_structure": config.get("tvshows_folder_structure", DEFAULT_FOLDER_STRUCTURES["tv"]),
+        })
+    return legacy
+
+def map_library_path(path, path_map):
+    """Maps a NAS path to the container path it is mounted at (longest prefix wins)."""
+    for nas_path in sorted(path_map, key=len, reverse=True):
+        if path == nas_path or path.startswith(nas_path.rstrip("/") + "/"):
+            return path_map[nas_path] + path[len(nas_path.rstrip("/")):]
+    return path
+
+def folder_pattern(folder_structure):
+    """
+    Builds a regex from a Sonarr/Radarr style folder template.
+    Title tokens capture the title, {TmdbId} captures the ID and any other token matches anything.
+    """
+    pattern = ""
+    pos = 0
+    for token in re.finditer(r"\{([^{}]+)\}", folder_structure):
+        pattern += re.escape(folder_structure[pos:token.start()])
+        name = token.group(1)
+        if name in ("TmdbId", "TmdbID"):
+            pattern += r"(?P<id>\d+)"
+        elif "Title" in name and "(?P<title>" not in pattern:
+            pattern += r"(?P<title>.+?)"
+        elif name == "Release Year" and "(?P<year>" not in pattern:
+            pattern += r"(?P<year>\d{4})"
+        else:
+            pattern += r".*?"
+        pos = token.end()
+    pattern += re.escape(folder_structure[pos:])
+    return re.compile(f"^{pattern}$")
+
+def parse_library_folder(folder, pattern):
+    """Returns (title, tmdb_id) for a library folder name, or None if it has no TMDB ID."""
+    match = pattern.match(folder)
+    if match and "id" in match.groupdict():
+        title = (match.groupdict().get("title") or folder).strip()
+        year = match.groupdict().get("year")
+        # Keep the year so remakes ("Dune (1984)", "Dune (2021)") stay apart
+        if year and year not in title:
+            title = f"{title} ({year})"
+        return title, match.group("id")
+
+    # Fall back to the plain "tmdb-<id>" marker for folders not following the template
+    if "tmdb-" in folder:
+        parts = folder.split("tmdb-")
+        tmdb_id = re.match(r"\d+", parts[1])
+        if tmdb_id:
+            return parts[0].strip(" ({["), tmdb_id.group(0)
+    return None
+
+def library_entry(library, folder_path, pattern):
+    """Builds the titles.json entry for one folder of a library, or None if it has no TMDB ID."""
+    name = library.get("name", library["path"])
+    folder = os.path.basename(folder_path)
+    parsed = parse_library_folder(folder, pattern)
+    if not parsed:
+        print(f"WARNING: Skipped '{folder}' in {name} (No TMDB ID found)")
+        log_download(f"WARNING: Skipped '{folder}' in {name} (No TMDB ID found)")
+        return None
+
+    title, tmdb_id = parsed
+    entry = {"title": title, "type": library.get("type", "movie"), "id": tmdb_id,
+             "library": name, "folders": [folder_path]}
+    if library.get("source"):
+        entry["source"] = library["source"]
+    return entry
+
+def scan_library(library):
+    """Scans one library root and returns its titles. Runs in its own worker thread."""
+    name = library.get("name", library["path"])
+    media_type = library.get("type", "movie")
+    path = map_library_path(library["path"], library.get("path_map", {}))
+    pattern = folder_pattern(library.get("folder_structure", DEFAULT_FOLDER_STRUCTURES[media_type]))
+
+    if not os.path.isdir(path):
+        print(f"WARNING: Library '{name}' path {path} does not exist, skipping...")
+        log_download(f"WARNING: Library '{name}' path {path} does not exist, skipping...")
+        return []
+
+    titles = []
+    try:
+        with os.scandir(path) as entries:
+            for folder in entries:
+                if folder.is_dir():
+                    entry = library_entry(library, folder.path, pattern)
+                    if entry:
+                        titles.append(entry)
+    except OSError as e:
+        # Permission denied, stale NFS handle...: skip this mount, keep scanning the others
+        print(f"ERROR: Failed to scan library '{name}' at {path}: {e}")
+        log_download(f"ERROR: Failed to scan library '{name}' at {path}: {e}")
+        return []
+
+    print(f"LOG: Found {len(titles)} titles in library '{name}'.")
+    return titles
+
+def merge_titles(titles, new_titles):
+    """
+    Merges new_titles into titles in place, keyed by media type and TMDB ID.
+    Returns the entries that were not already present.
+    """
+    merged = {(entry["type"], entry["id"]): entry for entry in titles if entry.get("id")}
+    added = []
+    for entry in new_titles:
+        key = (entry["type"], entry["id"])
+        if key in merged:
+            folders = merged[key].setdefault("folders", [])
+            folders.extend(f for f in entry.get("folders", []) if f not in folders)
+        else:
+            merged[key] = entry
+            titles.append(entry)
+            added.append(entry)
+    return added
+
+def scan_libraries(libraries):
+    """
+    Scans all library roots concurrently (one worker per mount) and merges the results.
+    Titles present in several libraries are kept once, keyed by media type and TMDB ID.
+    """
+    if not libraries:
+        return []
+
+    titles = []
+    with ThreadPoolExecutor(max_workers=len(libraries)) as executor:
+        # map() keeps library order, so the first library listing a title decides its source
+        for library_titles in executor.map(scan_library, libraries):
+            merge_titles(titles, library_titles)
+    return titles
+
+def get_source(entry, config):
+    """Returns the backdrop source for a title: its library preference, else the per-type setting."""
+    if entry.get("source"):
+        return entry["source"]
+    key = "movies_source" if entry.get("type") == "movie" else "tvshows_source"
+    return config.get(key, "TMDB")
+
 def extract_titles_from_folders():
     """ Extracts titles and TMDB IDs from either local device folders or Trakt lists. """
     config = load_config()
@@ -75,38 +287,7 @@ def extract_titles_from_folders():
     titles = []
 
     if data_source == "My Devices":
-        movies_path = config.get("movies_folder", "")
-        tvshows_path = config.get("tvshows_folder", "")
-
-        # Adjust paths if running inside Docker (maps NAS paths to container paths)
-        if movies_path.startswith("/volume1/"):
-            movies_path = movies_path.replace("/volume1/Movies", "/movies")
-        if tvshows_path.startswith("/volume1/"):
-            tvshows_path = tvshows_path.replace("/volume1/TV Shows", "/tvshows")
-
-        # Process movies
-        if os.path.exists(movies_path):
-            for folder in os.listdir(movies_path):
-                if "tmdb-" in folder:
-                    parts = folder.split("tmdb-")
-                    title = parts[0].strip()
-                    tmdb_id = parts[1].split("}")[0]
-                    titles.append({"title": title, "type": "movie", "id": tmdb_id})
-                else:
-                    print(f"WARNING: Skipped '{folder}' in Movies (No TMDB ID found)")
-                    log_download(f"WARNING: Skipped '{folder}' in Movies (No TMDB ID found)")
-
-        # Process TV shows
-        if os.path.exists(tvshows_path):
-            for folder in os.listdir(tvshows_path):
-                if "tmdb-" in folder:
-                    parts = folder.split("tmdb-")
-                    title = parts[0].strip()
-                    tmdb_id = parts[1].split("}")[0]
-                    titles.append({"title": title, "type": "tv", "id": tmdb_id})
-                else:
-                    print(f"WARNING: Skipped '{folder}' in TV Shows (No TMDB ID found)")
-                    log_download(f"WARNING: Skipped '{folder}' in TV Shows (No TMDB ID found)")
+        titles = scan_libraries(get_libraries(config))
 
     elif data_source == "Trakt List":
         trakt_movies_url = config.get("trakt_movies_list", "")
@@ -123,7 +304,7 @@ def extract_titles_from_folders():
             titles.extend(trakt_tvshows)
 
         # Resolve TMDB IDs using TMDB API if missing
-        for entry in titles:
+        for entry in titles[:]:  # Iterate over a copy to allow removal
             if not entry["id"]:
                 tmdb_id = fetch_tmdb_id(entry["title"], entry["type"])
                 if tmdb_id:
@@ -133,65 +314,16 @@ def extract_titles_from_folders():
                     log_download(f"WARNING: Could not resolve TMDB ID for {entry['title']}, skipping...")
                     titles.remove(entry)
 
+    migrate_backdrop_names(titles)
+
     # Save extracted titles
-    with open(TITLES_FILE, "w") as f:
-        json.dump(titles, f, indent=4)
+    with _titles_lock:
+        with open(TITLES_FILE, "w") as f:
+            json.dump(titles, f, indent=4)
 
     print(f"LOG: Extracted {len(titles)} titles from {data_source}.")
     log_download(f"Extracted {len(titles)} titles from {data_source}.")
 
-    # Adjust paths if running inside Docker (maps NAS paths to container paths)
-    if movies_path.startswith("/volume1/"):
-        movies_path = movies_path.replace("/volume1/Movies", "/movies")
-    if tvshows_path.startswith("/volume1/"):
-        tvshows_path = tvshows_path.replace("/volume1/TV Shows", "/tvshows")
-
-    movie_format = config.get("movies_folder_structure", "{Movie CleanTitle} ({Release Year}) {tmdb-{TmdbId}}")
-    tv_format = config.get("tvshows_folder_structure", "{TV Show CleanTitle} ({Release Year}) {tmdb-{TmdbId}}")
-
-    titles = []
-
-    # Process movies
-    if os.path.exists(movies_path):
-        for folder in os.listdir(movies_path):
-            found_id = False
-            if "tmdb-" in folder:
-                parts = folder.split("tmdb-")
-                title = parts[0].strip()
-                tmdb_id = parts[1].split("}")[0]
-                titles.append({"title": title, "type": "movie", "id": tmdb_id})
-                found_id = True
-        
-            if not found_id:
-                if movies_path and os.path.exists(movies_path) and folder in os.listdir(movies_path):
-                    log_download(f"WARNING: Skipped '{folder}' in Movies (No TMDB ID found)")
-                elif tvshows_path and os.path.exists(tvshows_path) and folder in os.listdir(tvshows_path):
-                    log_download(f"WARNING: Skipped '{folder}' in TV Shows (No TMDB ID found)")
-                else:
-                    log_download(f"WARNING: Skipped '{folder}' (No TMDB ID found)")
-
-    # Process TV shows
-    if os.path.exists(tvshows_path):
-        for folder in os.listdir(tvshows_path):
-            found_id = False
-            if "tmdb-" in folder:
-                parts = folder.split("tmdb-")
-                title = parts[0].strip()
-                tmdb_id = parts[1].split("}")[0]
-                titles.append({"title": title, "type": "tv", "id": tmdb_id})
-                found_id = True
-
-            if not found_id:
-                if tvshows_path and os.path.exists(tvshows_path) and folder in os.listdir(tvshows_path):
-                    log_download(f"WARNING: Skipped '{folder}' in TV Shows (No TMDB ID found)")
-                else:
-                    log_download(f"WARNING: Skipped '{folder}' (No TMDB ID found)")
-            
-    with open(TITLES_FILE, "w") as f:
-        json.dump(titles, f, indent=4)
-
-    print(f"LOG: Extracted {len(titles)} titles from Movies & TV folders.")
-
 def load_config():
     """Loads configuration and ensures new settings are included if missing."""
     if os.path.exists(CONFIG_FILE):
@@ -295,6 +427,85 @@ def fetch_trakt_list(trakt_url, media_type):
 
     return extracted_titles
 
+# Backdrops are saved as {title}_{type}-{tmdb id}_{source}_{n}.jpg
+BACKDROP_NAME_RE = re.compile(r"^(?P<title>.*)_(?P<type>movie|tv)-(?P<id>\d+)_(?P<source>TMDB|Fanart)_(?P<n>\d+)\.jpg$")
+# Names used before the TMDB ID was added: {title}_{source}_{n}.jpg
+LEGACY_BACKDROP_NAME_RE = re.compile(r"^(?P<title>.+)_(?P<source>TMDB|Fanart)_(?P<n>\d+)\.jpg$")
+
+def backdrop_file_name(title, source, media_type, media_id, number):
+    """Returns the BACKDROP_DIR file name for a title's backdrop number (1-based)."""
+    return f"{title.replace(' ', '_')}_{media_type}-{media_id}_{source}_{number}.jpg"
+
+def backdrop_index():
+    """
+    Lists BACKDROP_DIR once and groups the backdrops by (type, TMDB ID, source).
+    Each group holds the file names sorted by backdrop number.
+    """
+    index = {}
+    for name in os.listdir(BACKDROP_DIR):
+        match = BACKDROP_NAME_RE.match(name)
+        if match:
+            key = (match.group("type"), match.group("id"), match.group("source"))
+            index.setdefault(key, []).append((int(match.group("n")), name))
+    return {key: [name for _, name in sorted(files)] for key, files in index.items()}
+
+def migrate_backdrop_names(titles):
+    """
+    Renames backdrops saved under the old {title}_{source}_{n}.jpg scheme to include the
+    media type and TMDB ID, so existing downloads are reused instead of fetched again.
+    """
+    legacy_files = {}
+    for name in os.listdir(BACKDROP_DIR):
+        match = LEGACY_BACKDROP_NAME_RE.match(name)
+        if match and not BACKDROP_NAME_RE.match(name):
+            legacy_files.setdefault(match.group("title"), []).append(match)
+    if not legacy_files:
+        return
+
+    renamed = 0
+    for entry in titles:
+        if not entry.get("id"):
+            continue
+        # Older versions used the folder name up to "tmdb-" as the title, e.g. "The Matrix (1999) {"
+        legacy_titles = {entry["title"]}
+        legacy_titles.update(os.path.basename(folder).split("tmdb-")[0].strip() for folder in entry.get("folders", []))
+        for legacy_title in legacy_titles:
+            for match in legacy_files.pop(legacy_title.replace(" ", "_"), []):
+                new_name = backdrop_file_name(entry["title"], match.group("source"), entry["type"], entry["id"], match.group("n"))
+                new_path = os.path.join(BACKDROP_DIR, new_name)
+                if not os.path.exists(new_path):
+                    os.rename(os.path.join(BACKDROP_DIR, match.group(0)), new_path)
+                    renamed += 1
+
+    if renamed:
+        print(f"LOG: Renamed {renamed} backdrops to the new file name scheme.")
+        log_download(f"Renamed {renamed} backdrops to the new file name scheme.")
+
+def save_backdrop(title, source, backdrop_url, index, media_type, media_id):
+    """Downloads one backdrop into BACKDROP_DIR, leaving the file untouched if the image is unchanged."""
+    print(f" Found Backdrop URL: {backdrop_url}")
+
+    file_name = backdrop_file_name(title, source, media_type, media_id, index + 1)
+    save_path = os.path.join(BACKDROP_DIR, file_name)
+
+    try:
+        img_data = requests.get(backdrop_url, timeout=30).content
+        if (os.path.exists(save_path) and os.path.getsize(save_path) == len(img_data)
+                and file_hash(save_path) == hashlib.sha1(img_data).hexdigest()):
+            print(f" Unchanged: {save_path}")
+            return save_path
+
+        # Write in place so hardlinked exports in the media folders stay linked
+        with open(save_path, "wb") as f:
+            f.write(img_data)
+        print(f" Successfully saved: {save_path}")
+        log_download(f"Downloaded {file_name} from {source}")
+        return save_path
+    except Exception as e:
+        print(f" Error saving image: {e}")
+        log_download(f"Error saving {file_name}: {e}")
+        return None
+
 def download_backdrop(title, source, media_type, media_id):
     print(f" Function called: download_backdrop('{title}', '{source}', '{media_type}', {media_id})")
 
@@ -309,9 +520,6 @@ def download_backdrop(title, source, media_type, media_id):
             log_download(f"ERROR: Unable to fetch TMDB ID for {title}. Skipping backdrop download.")
             return
 
-    # Get backdrop limit from config
-    backdrop_limit = config.get("backdrop_limit", "1").strip().lower()
-
     # Define `url` based on the source
     if source == "TMDB":
         url = f"https://api.themoviedb.org/3/{media_type}/{media_id}/images?api_key={api_key}"
@@ -322,6 +530,14 @@ def download_backdrop(title, source, media_type, media_id):
         log_download(f"ERROR: Invalid source '{source}'")
         return
 
+    if not api_key:
+        print(f" API key missing for {source}")
+        log_download(f"API key missing for {source}")
+        if source == "Fanart":
+            log_download(f"Retrying {title} with TMDB instead of Fanart.tv.")
+            download_backdrop(title, "TMDB", media_type, media_id)
+        return
+
     # Make the API request
     try:
         response = requests.get(url, timeout=10)
@@ -330,220 +546,247 @@ def download_backdrop(title, source, media_type, media_id):
     except requests.exceptions.RequestException as e:
         print(f" ERROR: API request failed for {source} - {e}")
         log_download(f"ERROR: API request failed for {source} - {e}")
+
+        # Fallback logic: If Fanart fails, try TMDB
+        if source == "Fanart":
+            log_download(f"Retrying {title} with TMDB instead of Fanart.tv.")
+            download_backdrop(title, "TMDB", media_type, media_id)
         return
 
     print(f" API Response: {response}")
 
-    # Apply No Languages filter for TMDB
+    # Only download backdrops from the "No Languages" section
     if source == "TMDB":
         backdrops = [b for b in response.get("backdrops", []) if b.get("iso_639_1") is None]
-    elif source == "Fanart":
-        backdrops = [b for b in response.get(f"{'moviebackground' if media_type == 'movie' else 'showbackground'}", []) if b.get("lang") == "none"]
     else:
-        backdrops = []
-
-    # Determine the limit
-    if backdrop_limit in [None, "", "all"]:
-        limit = len(backdrops)
-    else:
-        try:
-            limit = max(1, int(backdrop_limit))
-        except ValueError:
-            limit = 1
+        backdrops = [b for b in response.get("moviebackground" if media_type == "movie" else "showbackground", []) if b.get("lang") == "none"]
 
     if not backdrops:
+        if source == "Fanart":
+            log_download(f"Fanart.tv did not return backdrops for {title}. Falling back to TMDB.")
+            download_backdrop(title, "TMDB", media_type, media_id)
+            return
         print(f" No backdrops found in 'No Languages' section for {title} on {source}.")
         log_download(f"No backdrops found in 'No Languages' section for {title} on {source}.")
         return
 
     # Download up to the requested number of backdrops
+    limit = get_backdrop_limit(config)
     for i, backdrop in enumerate(backdrops[:limit]):
         backdrop_url = backdrop["url"] if source == "Fanart" else f"https://image.tmdb.org/t/p/original{backdrop['file_path']}"
-        save_backdrop(title, source, backdrop_url, i)
+        save_backdrop(title, source, backdrop_url, i, media_type, media_id)
+
+# Backdrop file names each media server picks up from a title's folder.
+# "first" is used for the first backdrop, "other" (with {n} = 1, 2, ...) for the rest.
+EXPORT_NAMING = {
+    "plex": {"first": "fanart.jpg", "other": "backdrop{n}.jpg"},
+    "jellyfin": {"first": "backdrop.jpg", "other": "backdrop{n}.jpg"},
+    "kodi": {"first": "fanart.jpg", "other": "fanart{n}.jpg"},
+}
 
-    # Get backdrop limit from config
-    backdrop_limit = config.get("backdrop_limit", "1").strip().lower()
+FICLONE = 0x40049409  # Linux ioctl that reflinks one file into another (btrfs, XFS)
 
-    # Define `url` FIRST, before making the request
-    if source == "TMDB":
-        url = f"https://api.themoviedb.org/3/{media_type}/{media_id}/images?api_key={api_key}"
-    elif source == "Fanart":
-        url = f"https://webservice.fanart.tv/v3/{media_type}/{media_id}?api_key={api_key}"
-    else:
-        print(f" ERROR: Invalid source '{source}'")
-        log_download(f"ERROR: Invalid source '{source}'")
-        return
+_invalid_naming_logged = None  # Last invalid custom export naming reported, to log it once
 
-    # Make the API request (only once)
-    try:
-        response = requests.get(url, timeout=10)  # Now `url` exists 
-        response.raise_for_status()  
-        response = response.json()
-    except requests.exceptions.RequestException as e:
-        print(f" ERROR: API request failed for {source} - {e}")
-        log_download(f"ERROR: API request failed for {source} - {e}")
-
-        # Fallback logic: If Fanart fails, try TMDB
-        if source == "Fanart":
-            log_download(f"Retrying {title} with TMDB instead of Fanart.tv.")
-            download_backdrop(title, "TMDB", media_type, media_id)
-        return
+def file_hash(path):
+    """Returns the SHA-1 hex digest of a file, read in chunks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    print(f" API Response: {response}")  # Log the API response
+def files_match(path_a, path_b):
+    """Returns True if both files have the same content (size first, then hash)."""
+    if os.path.samefile(path_a, path_b):
+        return True
+    return os.path.getsize(path_a) == os.path.getsize(path_b) and file_hash(path_a) == file_hash(path_b)
 
-    # Now we determine the limit AFTER we have the response
-    if backdrop_limit in [None, "", "all"]:  # Handle None, empty, or "all" cases
-        limit = len(response.get("backdrops", [])) if "backdrops" in response else 0
-    else:
-        try:
-            limit = max(1, int(backdrop_limit))  # Ensure at least 1
-        except ValueError:
-            limit = 1  # Fallback to default if invalid input
+def export_file(src, dest, link_mode):
+    """
+    Places src at dest, preferring a hardlink, then a reflink, then a copy.
+    Returns how the file was placed, or "unchanged" if dest already has the same content.
+    """
+    dest_exists = os.path.exists(dest)
+    if dest_exists and os.path.samefile(src, dest):
+        return "unchanged"
 
-    # Keep the API key validation check at the end
-    if not api_key:
-        print(f" API key missing for {source}")
-        log_download(f"API key missing for {source}")
-        return
+    tmp_path = f"{dest}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
 
-        # Fetch API response first
+    # A hardlink is worth replacing an identical copy for, since it frees the duplicate
+    if link_mode != "copy":
         try:
-            response = requests.get(url, timeout=10)  # Timeout to prevent hanging
-            response.raise_for_status()  # Raise an error for HTTP failures (4xx, 5xx)
-            response = response.json()  # Convert to JSON
-        except requests.exceptions.RequestException as e:
-            print(f" ERROR: API request failed for {source} - {e}")
-            log_download(f"ERROR: API request failed for {source} - {e}")
-
-            # Fallback logic: If Fanart fails, try TMDB
-            if source == "Fanart":
-                log_download(f"Retrying {title} with TMDB instead of Fanart.tv.")
-                download_backdrop(title, "TMDB", media_type, media_id)
-            return
+            os.link(src, tmp_path)
+            os.replace(tmp_path, dest)
+            return "hardlink"
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # A reflink or copy of identical content would only churn the inode and mtime
+    if dest_exists and files_match(src, dest):
+        return "unchanged"
+
+    method = None
+    if link_mode != "copy":
+        # Different filesystem (or bind mount); try a copy-on-write clone before copying
+        try:
+            with open(src, "rb") as src_file, open(tmp_path, "wb") as dest_file:
+                fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+            method = "reflink"
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
-        print(f" API Response: {response}")  # Log the API response
+    if method is None:
+        shutil.copyfile(src, tmp_path)
+        method = "copy"
 
-        # If user enters "all" or leaves it blank, download everything
-        if backdrop_limit == "" or backdrop_limit == "all":
-            limit = len(response.get("backdrops", []))
-        else:
-            try:
-                limit = max(1, int(backdrop_limit))  # Ensure minimum of 1
-            except ValueError:
-                limit = 1  # Fallback to default if input is invalid
+    os.replace(tmp_path, dest)
+    return method
 
-        # Download only backdrops from the "No Languages" section
-        tmdb_backdrops = [b for b in response.get("backdrops", []) if b.get("iso_639_1") is None]
+def get_export_naming(config):
+    """
+    Returns the export naming for the configured media server, or None if export is off
+    or the custom naming is invalid.
+    """
+    global _invalid_naming_logged
+    media_server = config.get("export_media_server", "").lower()
+    if media_server != "custom":
+        return EXPORT_NAMING.get(media_server)
 
-        if not tmdb_backdrops:
-            print(f" No backdrops found in 'No Languages' section for {title} on TMDB.")
-            log_download(f"No backdrops found in 'No Languages' section for {title} on TMDB.")
-            return
+    naming = config.get("export_naming") or EXPORT_NAMING["jellyfin"]
+    try:
+        first, other = naming["first"], naming["other"]
+        if not isinstance(first, str) or not isinstance(other, str) or not first or "{n}" not in other:
+            raise ValueError("'first' must be a file name and 'other' must contain {n}")
+        names = [first] + [other.format(n=n) for n in (1, 2)]
+        if len(set(names)) != len(names) or any(os.sep in name for name in names):
+            raise ValueError("names must be distinct file names without a folder")
+    except (TypeError, KeyError, IndexError, ValueError) as e:
+        if _invalid_naming_logged != repr(naming):
+            _invalid_naming_logged = repr(naming)
+            print(f"ERROR: Invalid export_naming {naming}: {e}. Export is turned off.")
+            log_download(f"ERROR: Invalid export_naming {naming}: {e}. Export is turned off.")
+        return None
+    return naming
 
-        for i, backdrop in enumerate(tmdb_backdrops[:limit]):  # Apply limit properly
-            backdrop_url = f"https://image.tmdb.org/t/p/original{backdrop['file_path']}"
-            save_backdrop(title, source, backdrop_url, i)
+def get_backdrop_limit(config):
+    """Returns the number of backdrops to keep per title, or None for all."""
+    backdrop_limit = str(config.get("backdrop_limit", "1")).strip().lower()
+    if backdrop_limit in ["", "all"]:
+        return None
+    try:
+        return max(1, int(backdrop_limit))
+    except ValueError:
+        return 1
+
+def title_backdrops(entry, source, limit):
+    """Returns the saved backdrop file names of a title for one source, in order, up to limit."""
+    names = []
+    while limit is None or len(names) < limit:
+        name = backdrop_file_name(entry["title"], source, entry["type"], entry["id"], len(names) + 1)
+        if not os.path.exists(os.path.join(BACKDROP_DIR, name)):
+            break
+        names.append(name)
+    return names
+
+def remove_stale_exports(entry, folder, naming, count):
+    """
+    Removes numbered exports beyond count (left over from a higher limit or another source).
+    Only files this tool exported, i.e. matching one of the title's backdrops, are removed.
+    """
+    other = re.compile("^" + re.escape(naming["other"]).replace(re.escape("{n}"), r"(\d+)") + "$")
+    stale = []
+    for name in os.listdir(folder):
+        match = other.match(name)
+        if match and int(match.group(1)) >= max(1, count):
+            stale.append(os.path.join(folder, name))
+    if not stale:
+        return
 
-    elif source == "Fanart":
-        url = f"https://webservice.fanart.tv/v3/{media_type}/{media_id}?api_key={api_key}"
+    own_files = [os.path.join(BACKDROP_DIR, name) for source in ("TMDB", "Fanart")
+                 for name in title_backdrops(entry, source, None)]
+    for path in stale:
+        if not any(files_match(own, path) for own in own_files):
+            continue  # Not one of ours; leave the user's own artwork alone
         try:
-            response = requests.get(url, timeout=10)  # Timeout to prevent hanging
-            response.raise_for_status()  # Raise an error for HTTP failures (4xx, 5xx)
-            response = response.json()  # Convert to JSON
-        except requests.exceptions.RequestException as e:
-            print(f" ERROR: API request failed for {source} - {e}")
-            log_download(f"ERROR: API request failed for {source} - {e}")
-
-            # Fallback logic: If Fanart fails, try TMDB
-            if source == "Fanart":
-                log_download(f"Retrying {title} with TMDB instead of Fanart.tv.")
-                download_backdrop(title, "TMDB", media_type, media_id)
-            return
-
-        print(f" API Response: {response}")  # Log the API response
+            os.remove(path)
+        except OSError as e:
+            print(f"ERROR: Failed to remove old export {path}: {e}")
+            log_download(f"ERROR: Failed to remove old export {path}: {e}")
+            continue
+        print(f"LOG: Removed old export {path}")
+        log_download(f"Removed old export {path}")
+
+def export_backdrops(entry, config):
+    """Exports a title's downloaded backdrops into each of its library folders."""
+    naming = get_export_naming(config)
+    folders = entry.get("folders", [])
+    if not naming or not folders:
+        return  # Export disabled, or the title came from a Trakt list
+
+    # Only the current source's backdrops, within the current limit; Fanart falls back to TMDB
+    limit = get_backdrop_limit(config)
+    source = get_source(entry, config)
+    backdrops = title_backdrops(entry, source, limit)
+    if not backdrops and source != "TMDB":
+        backdrops = title_backdrops(entry, "TMDB", limit)
+    if not backdrops:
+        return
 
-        backdrops = []
-    
-        if media_type == "movie" and "moviebackground" in response:
-            backdrops = [b for b in response["moviebackground"] if b.get("lang") == "none"]
-        elif media_type == "tv" and "showbackground" in response:
-            backdrops = [b for b in response["showbackground"] if b.get("lang") == "none"]
+    link_mode = config.get("export_link", "auto")
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print(f"WARNING: Export folder {folder} for {entry['title']} no longer exists, skipping...")
+            log_download(f"WARNING: Export folder {folder} for {entry['title']} no longer exists, skipping...")
+            continue
 
-        # If user enters "all" or leaves it blank, download everything
-        if backdrop_limit in [None, "", "all"]:  # Handle None, empty, or "all" cases
-            if media_type == "movie":
-                limit = len(response.get("moviebackground", [])) if "moviebackground" in response else 0
-            else:
-                limit = len(response.get("showbackground", [])) if "showbackground" in response else 0
-        else:
+        for n, name in enumerate(backdrops):
+            dest_name = naming["first"] if n == 0 else naming["other"].format(n=n)
+            dest = os.path.join(folder, dest_name)
             try:
-                limit = max(1, int(backdrop_limit))  # Ensure at least 1
-            except ValueError:
-                limit = 1  # Fallback to default if invalid input
-
-        if backdrops:
-            # Determine the number of available backdrops
-            available_count = len(backdrops)
-
-            # If limit is None, download all available backdrops
-            download_count = available_count if limit is None else min(limit, available_count)
-
-            for i, backdrop in enumerate(backdrops[:download_count]):  # Apply limit properly
-                backdrop_url = backdrop["url"]
-
-                print(f" Found Backdrop URL: {backdrop_url}")
-
-                # Store all backdrops inside /config/Backdrops/
-                file_name = f"{title.replace(' ', '_')}_{source}_{i+1}.jpg"
-                save_path = os.path.join(BACKDROP_DIR, file_name)
-
-                print(f" Saving image to: {save_path}")
-
-                try:
-                    img_data = requests.get(backdrop_url).content
-                    with open(save_path, "wb") as f:
-                        f.write(img_data)
-                    print(f" Successfully saved: {save_path}")
-                    log_download(f"Downloaded {file_name} from {source}")
-                except Exception as e:
-                    print(f" Error saving image: {e}")
-                    log_download(f"Error saving {file_name}: {e}")
-
-        else:
-            log_download(f"Fanart.tv did not return backdrops for {title}. Falling back to TMDB.")
-            download_backdrop(title, "TMDB", media_type, media_id)
-
-    if response and "backdrops" in response and response["backdrops"]:
-        # Determine the number of available backdrops
-        available_count = len(response["backdrops"])
-
-        # If limit is None, download all available backdrops
-        download_count = available_count if limit is None else min(limit, available_count)
-
-        for i, backdrop in enumerate(response["backdrops"][:download_count]):  # Apply limit properly
-            backdrop_url = f"https://image.tmdb.org/t/p/original{backdrop['file_path']}"
-
-            print(f" Found Backdrop URL: {backdrop_url}")
-
-            # Store all backdrops inside /config/Backdrops/
-            file_name = f"{title.replace(' ', '_')}_{source}_{i+1}.jpg"
-            save_path = os.path.join(BACKDROP_DIR, file_name)
+                method = export_file(os.path.join(BACKDROP_DIR, name), dest, link_mode)
+            except OSError as e:
+                print(f"ERROR: Failed to export {name} to {dest}: {e}")
+                log_download(f"ERROR: Failed to export {name} to {dest}: {e}")
+                continue
+            if method != "unchanged":
+                print(f"LOG: Exported {name} to {dest} ({method})")
+                log_download(f"Exported {name} to {dest} ({method})")
+
+        remove_stale_exports(entry, folder, naming, len(backdrops))
+
+def download_titles(titles):
+    """
+    Downloads backdrops for each title, resolving missing TMDB IDs first.
+    Returns the titles that could be processed.
+    """
+    config = load_config()
+    for entry in titles[:]:  # Iterate over a copy to allow removal
+        title = entry.get("title")
+        media_type = entry.get("type")
+        media_id = entry.get("id")
 
-            print(f" Saving image to: {save_path}")
+        # If ID is missing, fetch from TMDB
+        if not media_id:
+            tmdb_id = fetch_tmdb_id(title, media_type)
+            if tmdb_id:
+                entry["id"] = str(tmdb_id)
+            else:
+                print(f"WARNING: No valid TMDB ID found for {title}. Skipping...")
+                log_download(f"WARNING: No valid TMDB ID found for {title}. Skipping...")
+                titles.remove(entry)
+                continue  # Skip this entry
 
-            try:
-                img_data = requests.get(backdrop_url).content
-                with open(save_path, "wb") as f:
-                    f.write(img_data)
-                print(f" Successfully saved: {save_path}")
-                log_download(f"Downloaded {file_name} from {source}")
-            except Exception as e:
-                print(f" Error saving image: {e}")
-                log_download(f"Error saving {file_name}: {e}")
+        source = get_source(entry, config)
+        print(f"LOG: Processing {title} ({media_type})")
+        download_backdrop(title, source, media_type, entry["id"])
+        export_backdrops(entry, config)
 
-    else:
-        print(f" No backdrops found for {title} on {source}")
-        log_download(f"No backdrops found for {title} on {source}")
+    return titles
 
 @app.route('/')
 def index():
@@ -553,6 +796,7 @@ def index():
 @app.route('/config', methods=['POST'])
 def update_config():
     data = request.json
+    current = load_config()
     config = {
         "tmdb_api": data.get("tmdb_api", ""),
         "fanart_api": data.get("fanart_api", ""),
@@ -563,19 +807,29 @@ def update_config():
         "schedule_day": data.get("schedule_day", "monday").lower(),
         "schedule_time": data.get("schedule_time", "12:00"),
         "movies_folder": data.get("movies_folder", ""),
-        "tvshows_folder": data.get("tvshows_folder", "")
+        "tvshows_folder": data.get("tvshows_folder", ""),
+        "schedules": data.get("schedules", current.get("schedules", [])),
+        "libraries": data.get("libraries", current.get("libraries", [])),
+        "export_media_server": data.get("export_media_server", current.get("export_media_server", "")),
+        "export_naming": data.get("export_naming", current.get("export_naming", {})),
+        "export_link": data.get("export_link", current.get("export_link", "auto")),
+        "watch_mode": data.get("watch_mode", current.get("watch_mode", False)),
+        "watch_debounce": data.get("watch_debounce", current.get("watch_debounce", "30")),
+        "watch_max_wait": data.get("watch_max_wait", current.get("watch_max_wait", "300")),
+        "watch_poll_interval": data.get("watch_poll_interval", current.get("watch_poll_interval", "30"))
     }
     save_config(config)
-    schedule_download()
+    sync_schedule()
     return jsonify({"message": "Configuration updated", "config": config})
 
 
 @app.route('/Backdrops/<filename>')
 def serve_backdrop(filename):
     """ Serves the requested backdrop file """
-    file_path = os.path.join(BACKDROP_DIR, filename)
-    if os.path.exists(file_path):
-        return send_file(file_path, mimetype='image/jpeg')
+    if os.path.isfile(os.path.join(BACKDROP_DIR, filename)):
+        # send_from_directory rejects path traversal and hands the open file to the
+        # server's wsgi.file_wrapper, so gunicorn streams it with sendfile()
+        return send_from_directory(BACKDROP_DIR, filename, mimetype='image/jpeg')
     return "Not Found", 404
 
 @app.route('/random-backdrop')
@@ -587,9 +841,240 @@ def random_backdrop():
         return send_file(os.path.join(BACKDROP_DIR, random_file), mimetype='image/jpeg')
     return "Not Found", 404
 
-def schedule_download():
+# Filesystem types that don't deliver inotify events for changes made by other hosts
+NETWORK_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs"}
+
+_observers = []  # Running watchdog observers, one per library root
+_watch_pending = {}  # New folder path -> (library, path it was renamed from), waiting for the debounce window to close
+_watch_lock = threading.Lock()
+_watch_run_lock = threading.Lock()
+_watch_timer = None
+_watch_first_queued = None  # When the oldest folder in the pending batch was queued
+_watch_debounce = 30.0
+_watch_max_wait = 300.0
+
+def is_network_mount(path):
+    """Returns True if path lives on an NFS/SMB style mount, according to /proc/mounts."""
+    path = os.path.realpath(path)
+    best_match, fs_type = "", None
+    try:
+        with open("/proc/mounts", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point = parts[1].replace("\\040", " ")
+                if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best_match):
+                    best_match, fs_type = mount_point, parts[2]
+    except OSError:
+        return False
+    return fs_type in NETWORK_FS_TYPES
+
+class LibraryEventHandler:
+    """Queues folders that are created in, or renamed into, the top level of a library root."""
+
+    def __init__(self, library, root):
+        self.library = library
+        self.root = os.path.normpath(root)
+
+    def dispatch(self, event):
+        if not event.is_directory or event.event_type not in ("created", "moved"):
+            return
+        if event.event_type == "moved":
+            path, old_path = event.dest_path, event.src_path
+        else:
+            path, old_path = event.src_path, None
+        if os.path.dirname(os.path.normpath(path)) == self.root:
+            queue_new_folder(self.library, path, old_path)
+
+def queue_new_folder(library, folder_path, old_path=None):
+    """Adds a new (or renamed) folder to the pending batch and restarts the debounce timer."""
+    global _watch_timer, _watch_first_queued
+    with _watch_lock:
+        if old_path in _watch_pending:
+            # Created and renamed within the same batch; only the final name matters
+            old_path = _watch_pending.pop(old_path)[1]
+        _watch_pending[folder_path] = (library, old_path)
+
+        now = time.monotonic()
+        if _watch_first_queued is None:
+            _watch_first_queued = now
+        # Bulk moves fire an event per folder, so wait until the library has been quiet,
+        # but never longer than _watch_max_wait after the first folder of the batch
+        delay = min(_watch_debounce, max(0.0, _watch_first_queued + _watch_max_wait - now))
+        if _watch_timer:
+            _watch_timer.cancel()
+        _watch_timer = threading.Timer(delay, process_new_folders)
+        _watch_timer.daemon = True
+        _watch_timer.start()
+
+def process_new_folders():
+    """Downloads backdrops for the folders queued by the watcher since the last batch."""
+    global _watch_first_queued
+    with _watch_lock:
+        pending = dict(_watch_pending)
+        _watch_pending.clear()
+        _watch_first_queued = None
+
+    renamed_from = {old_path for _, old_path in pending.values() if old_path}
+    new_titles = []
+    for folder_path, (library, _) in pending.items():
+        if not os.path.isdir(folder_path):
+            continue  # Removed or renamed again while we were waiting
+        pattern = folder_pattern(library.get("folder_structure", DEFAULT_FOLDER_STRUCTURES[library.get("type", "movie")]))
+        entry = library_entry(library, folder_path, pattern)
+        if entry:
+            new_titles.append(entry)
+
+    if not new_titles and not renamed_from:
+        return
+
+    with _watch_run_lock:
+        with _titles_lock:
+            try:
+                with open(TITLES_FILE, "r") as f:
+                    titles = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                titles = []
+
+            # Drop the old path of renamed folders; merge_titles adds the new one to the right title
+            for entry in titles:
+                if renamed_from.intersection(entry.get("folders", [])):
+                    entry["folders"] = [f for f in entry["folders"] if f not in renamed_from]
+
+            added = merge_titles(titles, new_titles)
+            with open(TITLES_FILE, "w") as f:
+                json.dump(titles, f, indent=4)
+
+        if not added:
+            return
+
+        print(f"LOG: Watch mode found {len(added)} new titles.")
+        log_download(f"Watch mode found {len(added)} new titles: {', '.join(entry['title'] for entry in added)}")
+        download_titles(added)
+        log_download("Watch mode backdrop download completed.")
+
+def stop_watcher():
+    """Stops all running library observers."""
+    for observer in _observers:
+        observer.stop()
+    for observer in _observers:
+        observer.join()
+    _observers.clear()
+
+def sync_watcher():
+    """(Re)starts the library observers to match the current watch mode settings."""
+    global _watch_debounce, _watch_max_wait
+    stop_watcher()
+
     config = load_config()
-    if config["run_frequency"] == "weekly":
+    if not config.get("watch_mode") or config.get("data_source", "My Devices") != "My Devices":
+        return
+
+    if Observer is None:
+        print("ERROR: Watch mode needs the 'watchdog' package, which is not installed.")
+        log_download("ERROR: Watch mode needs the 'watchdog' package, which is not installed.")
+        return
+
+    try:
+        _watch_debounce = max(1.0, float(config.get("watch_debounce", "30")))
+    except ValueError:
+        _watch_debounce = 30.0
+    try:
+        _watch_max_wait = max(_watch_debounce, float(config.get("watch_max_wait", "300")))
+    except ValueError:
+        _watch_max_wait = 300.0
+    try:
+        poll_interval = max(1.0, float(config.get("watch_poll_interval", "30")))
+    except ValueError:
+        poll_interval = 30.0
+
+    for library in get_libraries(config):
+        name = library.get("name", library["path"])
+        path = map_library_path(library["path"], library.get("path_map", {}))
+        if not os.path.isdir(path):
+            print(f"WARNING: Library '{name}' path {path} does not exist, not watching it.")
+            log_download(f"WARNING: Library '{name}' path {path} does not exist, not watching it.")
+            continue
+
+        method = library.get("watch", "auto")
+        if method == "auto":
+            method = "poll" if is_network_mount(path) else "inotify"
+
+        handler = LibraryEventHandler(library, path)
+        try:
+            observer = PollingObserver(timeout=poll_interval) if method == "poll" else Observer()
+            observer.schedule(handler, path, recursive=False)
+            observer.start()
+        except OSError as e:
+            # Usually the inotify watch limit; polling still works
+            print(f"WARNING: Could not watch '{name}' with inotify ({e}), polling instead.")
+            log_download(f"WARNING: Could not watch '{name}' with inotify ({e}), polling instead.")
+            method = "poll"
+            observer = PollingObserver(timeout=poll_interval)
+            observer.schedule(handler, path, recursive=False)
+            observer.start()
+
+        _observers.append(observer)
+        log_download(f"Watching library '{name}' at {path} ({method}).")
+
+def start_scheduler():
+    """
+    Starts the background scheduler once per deployment.
+    Every gunicorn worker calls this; only the process holding the lock file runs jobs.
+    """
+    global _scheduler_lock
+    if scheduler.running:
+        return True
+
+    lock = open(SCHEDULER_LOCK_FILE, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        print("LOG: Scheduler already owned by another process, not starting it here.")
+        return False
+
+    _scheduler_lock = lock
+    scheduler.start()
+
+    # Config may be saved through any worker, so pick up changes from settings.json
+    scheduler.add_job(sync_schedule, 'interval', seconds=60, id='sync_schedule', replace_existing=True)
+    sync_schedule()
+    print(f"LOG: Scheduler started in process {os.getpid()}.")
+    return True
+
+def sync_schedule():
+    """Rebuilds the download schedule and library watchers when settings.json has changed on disk."""
+    global _config_mtime
+    if not scheduler.running or not os.path.exists(CONFIG_FILE):
+        return  # Not the scheduler process; the owner picks the change up on its next check
+    mtime = os.path.getmtime(CONFIG_FILE)
+    if mtime != _config_mtime:
+        _config_mtime = mtime
+        schedule_download()
+        sync_watcher()
+
+def parse_interval(interval):
+    """Parses an interval such as "90", "30m", "6h" or "1d" into minutes. Raises ValueError unless positive."""
+    interval = str(interval).strip().lower()
+    units = {"m": 1, "h": 60, "d": 1440}
+    if interval and interval[-1] in units:
+        minutes = float(interval[:-1]) * units[interval[-1]]
+    else:
+        minutes = float(interval)
+    if not 0 < minutes < float("inf"):
+        raise ValueError(f"interval must be a positive duration, got '{interval}'")
+    return minutes
+
+def get_schedules(config):
+    """
+    Returns the configured scheduled jobs.
+    The legacy weekly run_frequency setting becomes a full refresh job named "weekly".
+    """
+    schedules = [job for job in config.get("schedules", []) if job.get("name")]
+
+    if config.get("run_frequency") == "weekly":
         day_of_week_map = {
             "monday": "mon",
             "tuesday": "tue",
@@ -600,79 +1085,218 @@ def schedule_download():
             "sunday": "sun"
         }
         day_of_week = day_of_week_map.get(config["schedule_day"].lower(), "mon")  # Default to Monday if invalid
-        schedule_time = config["schedule_time"]
-        hour, minute = map(int, schedule_time.split(":"))
+        hour, minute = map(int, config["schedule_time"].split(":"))
+        schedules.append({"name": "weekly", "cron": f"{minute} {hour} * * {day_of_week}", "mode": "full"})
+
+    return schedules
+
+def schedule_download():
+    if not scheduler.running:
+        return  # Not the scheduler process; the owner picks the change up via sync_schedule()
+
+    config = load_config()
+    wanted = set()
+    for job in get_schedules(config):
+        job_id = f"download_{job['name']}"
+        try:
+            jitter = int(job.get("jitter") or 0) or None  # Random start delay in seconds to spread API load
+            if jitter is not None and jitter < 0:
+                raise ValueError(f"jitter must not be negative, got {jitter}")
+            # add_job() ignores jitter for trigger instances, so it goes on the trigger itself
+            if job.get("cron"):
+                trigger = CronTrigger.from_crontab(job["cron"])
+                trigger.jitter = jitter
+            elif job.get("interval"):
+                trigger = IntervalTrigger(minutes=parse_interval(job["interval"]), jitter=jitter)
+            else:
+                raise ValueError("needs a 'cron' or 'interval'")
+            if job.get("max_runtime"):
+                parse_interval(job["max_runtime"])
+        except (ValueError, TypeError) as e:
+            print(f"ERROR: Invalid schedule '{job['name']}': {e}")
+            log_download(f"ERROR: Invalid schedule '{job['name']}': {e}")
+            continue
 
         scheduler.add_job(
             run_scheduled_download,
-            'cron',
-            day_of_week=day_of_week,
-            hour=hour,
-            minute=minute,
-            id='weekly_download',
+            trigger,
+            args=[job],
+            id=job_id,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=3600,
             replace_existing=True
         )
-        scheduler.start()
+        wanted.add(job_id)
+        log_download(f"Scheduled backdrop download '{job['name']}' set for {job.get('cron') or 'every ' + str(job['interval'])}.")
 
-        log_download(f"Scheduled backdrop download set for {config['schedule_day']} at {config['schedule_time']}.")
+    for existing in scheduler.get_jobs():
+        if existing.id.startswith("download_") and existing.id not in wanted:
+            scheduler.remove_job(existing.id)
+            log_download(f"Scheduled backdrop download '{existing.id[len('download_'):]}' removed.")
 
-def run_scheduled_download():
-    log_download("Scheduled weekly download initiated.")
+def load_schedule_state():
+    """Loads where each scheduled job stopped when it ran out of time."""
+    if os.path.exists(SCHEDULE_STATE_FILE):
+        try:
+            with open(SCHEDULE_STATE_FILE, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            log_download("ERROR: Corrupted schedule_state.json detected. Starting jobs from the beginning.")
+    return {}
 
-    # Extract titles before running the scheduled job
-    print("LOG: Running scheduled extraction of titles...")
-    extract_titles_from_folders()
+def update_schedule_state(name, job_state):
+    """
+    Stores (or clears, when job_state is None) one job's entry in schedule_state.json.
+    Jobs run concurrently, so the file is re-read under a lock and only this job's key changes.
+    """
+    with _schedule_state_lock:
+        state = load_schedule_state()
+        if job_state is None:
+            if name not in state:
+                return
+            state.pop(name)
+        else:
+            state[name] = job_state
+        with open(SCHEDULE_STATE_FILE, "w") as f:
+            json.dump(state, f, indent=4)
 
-    # Verify if extraction worked
-    if not os.path.exists(TITLES_FILE):
-        print("ERROR: Titles file not found! Retrying extraction...")
+def has_backdrop(entry, backdrops):
+    """
+    Returns True if a backdrop was already downloaded for this title, from any source
+    (a Fanart title that fell back to TMDB has TMDB files). backdrops comes from backdrop_index().
+    """
+    return any((entry.get("type"), entry.get("id"), source) in backdrops for source in ("TMDB", "Fanart"))
+
+def title_key(entry):
+    """Stable key for a title across runs: media type and TMDB ID (or title while the ID is unknown)."""
+    return f"{entry.get('type')}:{entry.get('id') or entry.get('title')}"
+
+def select_job_titles(job, config):
+    """Returns the titles a scheduled job should process, in a stable order."""
+    if job.get("libraries"):
+        if config.get("data_source", "My Devices") != "My Devices":
+            print(f"WARNING: Schedule '{job['name']}' is limited to libraries, but the list source is {config.get('data_source')}. Skipping...")
+            log_download(f"WARNING: Schedule '{job['name']}' is limited to libraries, but the list source is {config.get('data_source')}. Skipping.")
+            return []
+
+        # Only rescan this job's libraries, but keep the other titles in titles.json
+        libraries = [lib for lib in get_libraries(config) if lib.get("name") in job["libraries"]]
+        scanned = scan_libraries(libraries)
+        with _titles_lock:
+            try:
+                with open(TITLES_FILE, "r") as f:
+                    titles = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                titles = []
+            merge_titles(titles, scanned)
+            migrate_backdrop_names(titles)
+            with open(TITLES_FILE, "w") as f:
+                json.dump(titles, f, indent=4)
+
+        # Use the merged entries, which carry every folder of the title
+        by_key = {title_key(entry): entry for entry in titles}
+        job_titles = [by_key[title_key(entry)] for entry in scanned]
+    else:
         extract_titles_from_folders()
-        if not os.path.exists(TITLES_FILE):  # Double-check after retry
-            log_download("ERROR: Titles file missing after retry. Aborting scheduled run.")
-            return
+        with _titles_lock:
+            try:
+                with open(TITLES_FILE, "r") as f:
+                    job_titles = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                print("ERROR: Corrupted titles.json! Resetting...")
+                log_download("ERROR: Corrupted titles.json detected.")
+                with open(TITLES_FILE, "w") as f:
+                    json.dump([], f)  # Reset titles.json
+                return []
 
-    with open(TITLES_FILE, "r") as f:
-        try:
-            titles = json.load(f)
-        except json.JSONDecodeError:
-            print("ERROR: Corrupted titles.json! Resetting and re-extracting...")
-            log_download("ERROR: Corrupted titles.json detected.")
-            extract_titles_from_folders()
-            with open(TITLES_FILE, "w") as f:
-                json.dump([], f)  # Reset titles.json
-            return
+    if job.get("source"):
+        job_titles = [entry for entry in job_titles if get_source(entry, config) == job["source"]]
+
+    if job.get("mode", "full") == "incremental":
+        backdrops = backdrop_index()
+        job_titles = [entry for entry in job_titles if not has_backdrop(entry, backdrops)]
+
+    return sorted(job_titles, key=lambda entry: (entry.get("type", ""), entry.get("title", "")))
 
-    if not titles:
-        print("ERROR: No titles found for scheduled run. Skipping...")
-        log_download("ERROR: No titles found. Skipping scheduled backdrop download.")
+def save_job_results(changed):
+    """
+    Writes TMDB IDs resolved during a scheduled job back to titles.json and drops titles
+    that could not be resolved. changed maps a title's key at load time to its updated
+    entry, or None to remove it. titles.json is re-read so concurrent changes are kept.
+    """
+    if not changed:
         return
+    with _titles_lock:
+        try:
+            with open(TITLES_FILE, "r") as f:
+                titles = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        updated = []
+        for entry in titles:
+            key = title_key(entry)
+            if key not in changed:
+                updated.append(entry)
+            elif changed[key] is not None:
+                updated.append(changed[key])
+        with open(TITLES_FILE, "w") as f:
+            json.dump(updated, f, indent=4)
 
-    # Process and download backdrops
-    for entry in titles[:]:  # Iterate over a copy to allow removal
-        title = entry.get("title")
-        media_type = entry.get("type")
-        media_id = entry.get("id")
+def run_scheduled_download(job=None):
+    """
+    Runs one scheduled job. A job with a max_runtime stops when its budget is spent and
+    continues with the titles it has not finished on its next slot.
+    """
+    job = job or {"name": "manual", "mode": "full"}
+    name = job["name"]
+    log_download(f"Scheduled download '{name}' initiated.")
 
-        # If ID is missing, fetch from TMDB
-        if not media_id:
-            tmdb_id = fetch_tmdb_id(title, media_type)
-            if tmdb_id:
-                entry["id"] = str(tmdb_id)
-            else:
-                print(f"WARNING: No valid TMDB ID found for {title}. Skipping...")
-                log_download(f"WARNING: No valid TMDB ID found for {title}. Skipping...")
-                titles.remove(entry)
-                continue  # Skip this entry
+    config = load_config()
+    print(f"LOG: Running scheduled extraction of titles for '{name}'...")
+    job_titles = select_job_titles(job, config)
+
+    # Titles finished by an earlier run of this job that ran out of time
+    done = set(load_schedule_state().get(name, {}).get("done", []))
+    if done:
+        job_titles = [entry for entry in job_titles if title_key(entry) not in done]
+        log_download(f"Resuming '{name}': {len(done)} titles already done, {len(job_titles)} left.")
+
+    if not job_titles:
+        print(f"LOG: No titles to process for scheduled run '{name}'. Skipping...")
+        log_download(f"No titles to process for scheduled run '{name}'. Skipping.")
+        update_schedule_state(name, None)
+        return
 
-        source = load_config().get(f"{media_type}s_source", "TMDB")
-        print(f"LOG: Processing {title} ({media_type})")
-        download_backdrop(title, source, media_type, entry["id"])
+    deadline = None
+    if job.get("max_runtime"):
+        deadline = time.monotonic() + parse_interval(job["max_runtime"]) * 60
+
+    finished = 0
+    changed = {}
+    for entry in job_titles:
+        # Always finish at least one title, so even a tiny budget makes progress
+        if finished and deadline and time.monotonic() > deadline:
+            break
+        key = title_key(entry)
+        if not download_titles([entry]):
+            changed[key] = None  # No TMDB ID could be resolved
+        elif title_key(entry) != key:
+            changed[key] = entry  # TMDB ID resolved during the download
+            done.add(title_key(entry))
+        done.add(key)
+        finished += 1
 
     # Save the updated titles list (in case we fetched new TMDB IDs)
-    with open(TITLES_FILE, "w") as f:
-        json.dump(titles, f, indent=4)
+    save_job_results(changed)
 
-    log_download("Scheduled backdrop download completed.")
+    if finished < len(job_titles):
+        update_schedule_state(name, {"done": sorted(done)})
+        log_download(f"Scheduled download '{name}' reached its time budget after {finished} titles. Resuming next run.")
+        return
+
+    update_schedule_state(name, None)
+    log_download(f"Scheduled download '{name}' completed.")
 
 import sys
 
@@ -720,25 +1344,7 @@ def run_now():
                 return jsonify({"message": "No titles found even after reattempt."}), 400
 
         # Process and download backdrops
-        for entry in titles[:]:  # Iterate over a copy to allow removal
-            title = entry.get("title")
-            media_type = entry.get("type")
-            media_id = entry.get("id")
-
-            # If ID is missing, fetch from TMDB
-            if not media_id:
-                tmdb_id = fetch_tmdb_id(title, media_type)
-                if tmdb_id:
-                    entry["id"] = str(tmdb_id)
-                else:
-                    print(f"WARNING: No valid TMDB ID found for {title}. Skipping...")
-                    log_download(f"WARNING: No valid TMDB ID found for {title}. Skipping...")
-                    titles.remove(entry)
-                    continue  # Skip this entry
-
-            source = load_config().get(f"{media_type}s_source", "TMDB")
-            print(f"LOG: Processing {title} ({media_type})")
-            download_backdrop(title, source, media_type, entry["id"])
+        titles = download_titles(titles)
 
         # Save the updated titles list (in case we fetched new TMDB IDs)
         with open(TITLES_FILE, "w") as f:
@@ -754,5 +1360,6 @@ def run_now():
         return jsonify({"message": "Error running manual backdrop download", "error": str(e)}), 500
 
 if __name__ == '__main__':
-    schedule_download()
+    # Development server; production runs under gunicorn (see gunicorn.conf.py)
+    start_scheduler()
     app.run(host='0.0.0.0', port=8500, debug=True)
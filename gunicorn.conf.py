@@ -0,0 +1,26 @@
+# Production server settings for Backdrop Downloader.
+# Run with: gunicorn -c gunicorn.conf.py backdrop_downloader:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('BACKDROP_PORT', '8500')}"
+
+# Threaded workers keep the UI and image routes responsive while /run-now is busy
+worker_class = "gthread"
+workers = int(os.environ.get("BACKDROP_WORKERS", "2"))
+threads = int(os.environ.get("BACKDROP_THREADS", "8"))
+
+# A manual run can take a long time on big libraries
+timeout = int(os.environ.get("BACKDROP_TIMEOUT", "3600"))
+graceful_timeout = 30
+
+# Serve /Backdrops/<filename> with the sendfile() syscall
+sendfile = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    """Only the first worker to grab the lock file runs the scheduler."""
+    from backdrop_downloader import start_scheduler
+    start_scheduler()